@@ -9,16 +9,17 @@ Features:
 - Processes URLs from 'urls.txt'
 - Captures webpage titles, thumbnails, and timestamps
 - For Amazon pages: extracts prices and product details
+- Static non-Amazon pages are read over plain HTTP; the browser is only used as a fallback
 - Generates formatted PDF with proper spacing and layout
 - Includes error handling and retry mechanisms
 
 Required Packages:
-- PyMuPDF (fitz) - PDF generation
+- PyMuPDF (fitz) 1.23.8 or later - PDF generation
 - selenium - Web automation and scraping
 - webdriver_manager - Edge WebDriver management
 - Pillow (PIL) - Image processing
-- requests - HTTP requests
-- beautifulsoup4 - HTML parsing
+- aiohttp - Concurrent thumbnail downloads
+- selectolax - Fast HTML parsing
 
 Additional Requirements:
 - Microsoft Edge browser must be installed
@@ -39,57 +40,250 @@ from selenium.webdriver.edge.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from webdriver_manager.microsoft import EdgeChromiumDriverManager
 from datetime import datetime
-import time
-import requests
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import argparse
+import asyncio
+import hashlib
+import multiprocessing
 import os
+import queue
+import re
+import shelve
+import socket
+import threading
+import time
+import aiohttp
 from PIL import Image
 from io import BytesIO
-from bs4 import BeautifulSoup
+from html import escape
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+from selectolax.parser import HTMLParser
 import warnings
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
+# Number of headless Edge drivers fetching pages in parallel
+MAX_WORKERS = 4
+
+# Explicit wait timeout and polling interval, in seconds
+WAIT_TIMEOUT = 10
+POLL_FREQUENCY = 0.1
+
+# How long to wait for a JS-rendered page to add a preview image, in seconds
+PREVIEW_IMAGE_TIMEOUT = 3
+
+# Number of threads decoding and resizing thumbnails; once PROCESS_POOL_THRESHOLD
+# images need resizing, the rest go to a process per CPU instead
+IMAGE_WORKERS = 8
+PROCESS_POOL_THRESHOLD = 16
+
+# Cached msedgedriver path, re-resolved after DRIVER_CACHE_TTL seconds
+CACHE_DIR = Path.home() / '.cache' / 'productdigest'
+DRIVER_CACHE_FILE = CACHE_DIR / 'driver_path'
+DRIVER_CACHE_TTL = 7 * 86400
+
+# Edge profiles kept between runs so cookies survive and Amazon skips bot checks
+PROFILE_DIR = CACHE_DIR / 'edge-profile'
+AMAZON_HOME_URL = 'https://www.amazon.in/'
+
+# Scraped results and resized thumbnails are cached between runs; Amazon prices expire sooner
+PAGE_CACHE_FILE = CACHE_DIR / 'pages'
+PAGE_CACHE_TTL = 7 * 86400
+PRICE_CACHE_TTL = 24 * 3600
+
+# Resampling filter for thumbnails; Image.BICUBIC is faster with little visible loss at 800px
+RESAMPLE_FILTER = Image.LANCZOS
+
+# HTTP connection pool size and retry policy for aiohttp downloads
+POOL_SIZE = 16
+MAX_RETRIES = 2
+BACKOFF_FACTOR = 0.3
+
+# Number of threads resolving hostnames before scraping
+DNS_WORKERS = 16
+
+# Seconds to keep resolved hostnames in the aiohttp DNS cache
+DNS_CACHE_TTL = 600
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Styles for the text laid out on each PDF page
+PAGE_CSS = """
+* {font-family: sans-serif; font-size: 10pt;}
+h1 {font-size: 12pt; font-weight: normal; margin: 0 0 12pt 0;}
+p {margin: 0 0 8pt 0;}
+a {color: blue; text-decoration: none;}
+.error {color: red;}
+"""
+
+# One URL per line in urls.txt, surrounding whitespace (including NBSP) ignored; a leading '#' marks a
+# comment, and any other line containing whitespace is captured so it can be reported
+URL_RE = re.compile(r'^[^\S\n]*(?:#.*|([^\s#]\S*)|(.*?\S))[^\S\n]*$', re.M)
+
+# Subresources blocked in the browser to cut page-load time
+BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg',
+    '*.css', '*.woff', '*.woff2', '*.ttf',
+    '*/ads/*', '*doubleclick*', '*googletagmanager*', '*google-analytics*'
+]
+
+# Extracts the Amazon product title, image and price in a single WebDriver call
+AMAZON_DETAILS_SCRIPT = """
+const text = el => el ? el.innerText.trim() : null;
+const image = document.getElementById('landingImage') || document.querySelector('#main-image-container img');
+return {
+    title: text(document.getElementById('productTitle')),
+    image: image ? image.src : null,
+    priceSymbol: text(document.querySelector('.a-price-symbol')),
+    priceWhole: text(document.querySelector('.a-price-whole'))
+};
+"""
+
+# True once the page has a preview image meta tag or an <img> with a source
+HAS_PREVIEW_IMAGE_SCRIPT = """
+return !!document.querySelector(
+    'meta[property="og:image"], meta[name="og:image"], meta[property="twitter:image"], ' +
+    'meta[name="twitter:image"], meta[property="image"], meta[name="image"], img[src], img[data-src]'
+);
+"""
+
+def open_cache():
+  """Open the persistent page cache, or return None if it is unavailable."""
+  try:
+      PAGE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+      cache = shelve.open(str(PAGE_CACHE_FILE))
+  except Exception as e:
+      print(f"Could not open cache: {e}")
+      return None
+
+  # Older versions cached full-size downloads under 'image:'; drop them
+  for key in [key for key in cache.keys() if key.startswith('image:')]:
+      del cache[key]
+  return cache
+
+def cache_get(cache, kind, url, ttl):
+  """Return a cached value for the URL if it is younger than ttl seconds."""
+  if cache is None or not url:
+      return None
+  key = f"{kind}:{hashlib.blake2b(url.encode()).hexdigest()}"
+  entry = cache.get(key)
+  if entry is None:
+      return None
+  if time.time() - entry[1] < ttl:
+      return entry[0]
+  # Remove expired entries so the cache file does not keep growing
+  del cache[key]
+  return None
+
+def page_cache_ttl(url):
+  """Return how long scraped details for the URL stay fresh; Amazon prices change sooner."""
+  return PRICE_CACHE_TTL if is_amazon_url(url) else PAGE_CACHE_TTL
+
+def cache_put(cache, kind, url, value):
+  """Store a value for the URL in the cache."""
+  if cache is not None and url:
+      cache[f"{kind}:{hashlib.blake2b(url.encode()).hexdigest()}"] = (value, time.time())
+
+def get_driver_path(refresh=False):
+  """Return the msedgedriver path, using the cached value when it is recent."""
+  try:
+      if refresh:
+          # Edge may have updated past the cached driver; forget it and resolve again
+          DRIVER_CACHE_FILE.unlink(missing_ok=True)
+      elif time.time() - DRIVER_CACHE_FILE.stat().st_mtime < DRIVER_CACHE_TTL:
+          driver_path = DRIVER_CACHE_FILE.read_text().strip()
+          if Path(driver_path).exists():
+              return driver_path
+  except OSError:
+      pass
+
+  driver_path = EdgeChromiumDriverManager().install()
+  try:
+      DRIVER_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+      DRIVER_CACHE_FILE.write_text(driver_path)
+  except OSError as e:
+      print(f"Could not cache driver path: {e}")
+  return driver_path
+
+def create_driver(driver_path, profile_index=0):
+  """Create a headless Edge WebDriver with a persistent profile."""
+  # Each concurrent driver needs its own profile; Edge locks the directory while in use
+  profile_dir = PROFILE_DIR.with_name(f"{PROFILE_DIR.name}-{profile_index}")
+  first_run = not profile_dir.exists()
+
+  edge_options = Options()
+  edge_options.add_argument("--headless")
+  edge_options.add_argument("--disable-gpu")
+  edge_options.add_argument("--no-sandbox")
+  edge_options.add_argument("--log-level=3")
+  edge_options.add_argument("--blink-settings=imagesEnabled=false")
+  edge_options.add_argument(f"--user-data-dir={profile_dir}")
+  edge_options.add_argument("--disable-blink-features=AutomationControlled")
+  edge_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+  driver = webdriver.Edge(service=Service(driver_path), options=edge_options)
+  # Rely on explicit waits only so they are not compounded by implicit ones
+  driver.implicitly_wait(0)
+
+  # Skip subresources we never read; thumbnails are downloaded separately
+  driver.execute_cdp_cmd("Network.enable", {})
+  driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+
+  # Establish an Amazon session cookie once so later visits skip the first-visit checks
+  if first_run:
+      try:
+          driver.get(AMAZON_HOME_URL)
+          wait_ready(driver)
+      except Exception as e:
+          print(f"Could not warm up browser profile: {e}")
+  return driver
+
+def wait_for(driver, timeout=WAIT_TIMEOUT):
+  """Create an explicit wait that polls faster than Selenium's 500ms default."""
+  return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY)
+
+def wait_ready(driver):
+  """Wait until the page has finished loading."""
+  wait_for(driver).until(
+      lambda d: d.execute_script("return document.readyState") == "complete"
+  )
+
 def is_amazon_url(url):
   """Check if the URL is an Amazon URL."""
   amazon_domains = ['amazon.in', 'amzn.in', 'amazon.com']
   url_lower = url.lower()
   return any(domain in url_lower for domain in amazon_domains)
 
-def get_amazon_preview(url):
+def get_amazon_preview(driver, url):
   """Fetch product details from an Amazon URL."""
   try:
       driver.get(url)
-      time.sleep(2)  # Wait for the page to load
+      wait_ready(driver)
 
-      # Extract product title
-      title = WebDriverWait(driver, 10).until(
+      # Wait for the product title, then read everything in one round-trip
+      wait_for(driver).until(
           EC.presence_of_element_located((By.ID, "productTitle"))
-      ).text
+      )
+      details = driver.execute_script(AMAZON_DETAILS_SCRIPT)
 
-      # Extract product image
-      try:
-          img_element = WebDriverWait(driver, 10).until(
-              EC.presence_of_element_located((By.ID, "landingImage"))
-          )
-          thumbnail_url = img_element.get_attribute('src')
-      except:
-          # Fallback to other image elements
-          img_element = driver.find_element(By.CSS_SELECTOR, "#main-image-container img")
-          thumbnail_url = img_element.get_attribute('src')
-
-    # Extract product price
+      title = details['title']
+      thumbnail_url = details['image']
+
+      # Extract product price
       price = None
-      try:
-          # Extract price symbol and whole number separately
-          price_symbol = driver.find_element(By.CSS_SELECTOR, ".a-price-symbol").text
-          price_whole = driver.find_element(By.CSS_SELECTOR, ".a-price-whole").text
+      price_symbol = details['priceSymbol']
+      price_whole = details['priceWhole']
+      if price_symbol and price_whole:
           if (price_symbol == "₹"): 
                 price_symbol = "INR "
           price = f"{price_symbol}{price_whole}"
-      except:
+      else:
           print("Price not found")
 
       return title, thumbnail_url, price
@@ -97,87 +291,169 @@ def get_amazon_preview(url):
       print(f"Error fetching Amazon preview: {e}")
       return None, None, None
 
-def get_non_amazon_preview(url):
+def find_meta_image(tree):
+  """Return the preview image URL from the page's meta tags, if any."""
+  for meta_tag in ['og:image', 'twitter:image', 'image']:
+      for selector in (f'meta[property="{meta_tag}"]', f'meta[name="{meta_tag}"]'):
+          img_meta = tree.css_first(selector)
+          if img_meta and img_meta.attributes.get('content'):
+              return img_meta.attributes['content']
+  return None
+
+def find_largest_image(tree):
+  """Return the src of the <img> with the largest width/height attributes, if any."""
+  # Images and CSS are blocked in the browser, so the attributes are the only size we have;
+  # pages without them fall back to their first image with a source
+  thumbnail_url = None
+  first_url = None
+  max_area = 0
+  for img in tree.css('img'):
+      src = img.attributes.get('src') or img.attributes.get('data-src')
+      if not src:
+          continue
+      first_url = first_url or src
+      try:
+          area = int(img.attributes.get('width') or 0) * int(img.attributes.get('height') or 0)
+      except ValueError:
+          continue
+      if area > max_area:
+          max_area = area
+          thumbnail_url = src
+  return thumbnail_url or first_url
+
+def get_non_amazon_preview(driver, url):
   """Fetch webpage details from a non-Amazon URL."""
   max_retries = 3
   for attempt in range(max_retries):
       try:
           driver.get(url)
-          time.sleep(2 + attempt)  # Increasing wait time with each retry
+          wait_ready(driver)
 
-          soup = BeautifulSoup(driver.page_source, 'html.parser')
+          # JS-rendered pages may add their preview image after the load completes
+          try:
+              wait_for(driver, PREVIEW_IMAGE_TIMEOUT).until(
+                  lambda d: d.execute_script(HAS_PREVIEW_IMAGE_SCRIPT)
+              )
+          except TimeoutException:
+              pass
+
+          tree = HTMLParser(driver.page_source)
           
           # Try different meta tags for preview image
-          thumbnail_url = None
-          for meta_tag in ['og:image', 'twitter:image', 'image']:
-              img_meta = soup.find('meta', property=meta_tag) or soup.find('meta', attrs={'name': meta_tag})
-              if img_meta and img_meta.get('content'):
-                  thumbnail_url = img_meta['content']
-                  break
+          thumbnail_url = find_meta_image(tree)
 
           # If no meta tags found, try finding the largest image on the page
           if not thumbnail_url:
-              images = driver.find_elements(By.TAG_NAME, 'img')
-              max_area = 0
-              for img in images:
-                  try:
-                      width = int(img.get_attribute('width') or 0)
-                      height = int(img.get_attribute('height') or 0)
-                      area = width * height
-                      if area > max_area:
-                          max_area = area
-                          thumbnail_url = img.get_attribute('src')
-                  except:
-                      continue
-
-          title = soup.title.string if soup.title else 'No Title'
-          
+              thumbnail_url = find_largest_image(tree)
+
           if thumbnail_url:
-              return title, thumbnail_url
+              # Attribute values may be relative to the page, after any redirects
+              thumbnail_url = urljoin(driver.current_url, thumbnail_url)
+
+          title_node = tree.css_first('title')
+          title = title_node.text(strip=True) if title_node else 'No Title'
+          
+          # Reloading will not find an image that is not there; keep the page without one
+          return title, thumbnail_url
 
       except Exception as e:
           print(f"Attempt {attempt + 1} failed: {e}")
-          if attempt == max_retries - 1:
-              return None, None
-          time.sleep(1)
 
   return None, None
 
-def fetch_page_info(url):
+def fetch_page_info(driver, url):
   """Fetch page information based on URL type."""
   if is_amazon_url(url):
-      title, thumbnail_url, price = get_amazon_preview(url)
+      title, thumbnail_url, price = get_amazon_preview(driver, url)
       return title, thumbnail_url, price
   else:
-      title, thumbnail_url = get_non_amazon_preview(url)
+      title, thumbnail_url = get_non_amazon_preview(driver, url)
       return title, thumbnail_url, None
 
-def download_and_process_image(url, path):
-  """Download and process an image from a URL."""
+def prewarm_dns(urls):
+  """Resolve the unique hostnames of the URLs in parallel to warm the resolver cache."""
+  # Best effort only: a bad URL is reported later by its own entry, never here
+  hosts = set()
+  for url in urls:
+      try:
+          host = urlparse(url).hostname
+      except ValueError:
+          continue
+      if host:
+          hosts.add(host)
+
+  def resolve(host):
+      try:
+          socket.getaddrinfo(host, 443)
+      except (OSError, UnicodeError, ValueError):
+          pass
+
+  with ThreadPoolExecutor(max_workers=DNS_WORKERS) as executor:
+      list(executor.map(resolve, hosts))
+
+def create_session():
+  """Create an HTTP session that pools keep-alive connections and caches DNS lookups."""
   try:
-      headers = {
-          'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-      }
-      img_response = requests.get(url, headers=headers, stream=True)
-      img_response.raise_for_status()
-      
-      # Open the image and convert it
-      img = Image.open(BytesIO(img_response.content))
+      resolver = aiohttp.AsyncResolver()  # Needs the optional aiodns package
+  except RuntimeError:
+      resolver = None
+  connector = aiohttp.TCPConnector(limit=POOL_SIZE, limit_per_host=POOL_SIZE,
+                                   use_dns_cache=True, ttl_dns_cache=DNS_CACHE_TTL, resolver=resolver)
+  return aiohttp.ClientSession(headers=HEADERS, connector=connector)
+
+async def cheap_preview(session, url):
+  """Fetch the title and preview image of a static page without a browser."""
+  async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+      response.raise_for_status()
+      html = await response.text()
+      page_url = str(response.url)
+
+  tree = HTMLParser(html)
+  title = tree.css_first('title')
+  thumbnail_url = find_meta_image(tree)
+  if thumbnail_url:
+      # Meta images may be relative or protocol-relative to the page, after any redirects
+      thumbnail_url = urljoin(page_url, thumbnail_url)
+  return (title.text(strip=True) if title else None), thumbnail_url
+
+async def fetch_bytes(session, url):
+  """Download the raw bytes of a URL, retrying transient failures."""
+  for attempt in range(MAX_RETRIES + 1):
+      try:
+          async with session.get(url, timeout=aiohttp.ClientTimeout(total=15)) as response:
+              response.raise_for_status()
+              return await response.read()
+      except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+          # Bad URLs and 4xx responses will not succeed on retry; only retry 5xx and connection errors
+          if (attempt == MAX_RETRIES or isinstance(e, (aiohttp.InvalidURL, aiohttp.NonHttpUrlClientError))
+                  or (isinstance(e, aiohttp.ClientResponseError) and e.status < 500)):
+              raise
+          await asyncio.sleep(BACKOFF_FACTOR * (2 ** attempt))
+
+def download_and_process_image(image_data):
+  """Process downloaded image bytes into JPEG thumbnail bytes."""
+  try:
+      # Open the image and convert it; a corrupt image raises here
+      img = Image.open(BytesIO(image_data))
+      # Let libjpeg decode at a reduced DCT scale (no-op for other formats); draft only
+      # scales when both sides stay above the box, so size it to the image's aspect ratio
+      img.draft("RGB", (1600, max(1, 1600 * img.height // img.width)))
       img = img.convert("RGB")
-      img = img.resize((800, int(800 * img.height / img.width)), Image.LANCZOS)
-      img.save(path, "JPEG", quality=75)
+      img = img.resize((800, int(800 * img.height / img.width)), RESAMPLE_FILTER)
+      buffer = BytesIO()
+      img.save(buffer, "JPEG", quality=75, optimize=False)
       
-      return True
+      return buffer.getvalue()
   except Exception as e:
       print(f"Error downloading or processing image: {e}")
-      return False
+      return None
 
 def create_pdf(data, output_file):
   """Create a PDF document from the collected data."""
   doc = fitz.open()  # Create a new PDF document
 
   for index, entry in enumerate(data, start=1):
-      url, title, thumbnail_url, price, accessed_time = entry
+      url, title, thumbnail_url, price, accessed_time, jpeg_bytes = entry
       
       # Create a new page with margins
       page = doc.new_page()
@@ -185,73 +461,232 @@ def create_pdf(data, output_file):
       width, height = fitz.paper_size("a4")
       text_rect = fitz.Rect(margin, margin, width - margin, height - margin)
 
-      # Add title with numbering
-      y_offset = 0
-      page.insert_textbox(text_rect + (0, y_offset, 0, 0), f"{index}. {title}", fontsize=12, fontname="helv", color=(0, 0, 0), align=fitz.TEXT_ALIGN_LEFT)
-      y_offset += 95
-
-      # Add URL
-      page.insert_textbox(text_rect + (0, y_offset, 0, 0), f"URL: {url}", fontsize=10, fontname="helv", color=(0, 0, 1), align=fitz.TEXT_ALIGN_LEFT)
-      y_offset += 95
-
-      # Add accessed time
-      page.insert_textbox(text_rect + (0, y_offset, 0, 0), f"Accessed Time: {accessed_time}", fontsize=10, fontname="helv", color=(0, 0, 0), align=fitz.TEXT_ALIGN_LEFT)
-      y_offset += 95
-
-      # Add price if available
+      # Lay out the title, URL, accessed time and price in one flowed text box
+      html = f"<h1>{index}. {escape(title)}</h1>"
+      html += f'<p>URL: <a href="{escape(url)}">{escape(url)}</a></p>'
+      html += f"<p>Accessed Time: {accessed_time}</p>"
       if price:
-          page.insert_textbox(text_rect + (0, y_offset, 0, 0), f"Price: {price}", fontsize=10, fontname="helv", color=(0, 0, 0), align=fitz.TEXT_ALIGN_LEFT)
-          y_offset += 95
-
-      # Add thumbnail
-      if thumbnail_url:
-          img_path = f"temp_thumbnail_{index}.jpg"
-          if download_and_process_image(thumbnail_url, img_path):
-              try:
-                  if os.path.exists(img_path):
-                      img_rect = fitz.Rect(margin, y_offset, width - margin, y_offset + 300)  # Define where to place the image
-                      page.insert_image(img_rect, filename=img_path)
-                      os.remove(img_path)
-                      y_offset += 310  # Adjust y_offset for image height
-              except Exception as e:
-                  page.insert_textbox(text_rect + (0, y_offset, 0, 0), f"Thumbnail could not be loaded: {e}", fontsize=10, fontname="helv", color=(1, 0, 0), align=fitz.TEXT_ALIGN_LEFT)
-                  y_offset += 95
-          else:
-              page.insert_textbox(text_rect + (0, y_offset, 0, 0), "Thumbnail could not be downloaded.", fontsize=10, fontname="helv", color=(1, 0, 0), align=fitz.TEXT_ALIGN_LEFT)
-              y_offset += 95
+          html += f"<p>Price: {escape(price)}</p>"
+      if thumbnail_url and not jpeg_bytes:
+          html += '<p class="error">Thumbnail could not be downloaded.</p>'
+      spare_height, _ = page.insert_htmlbox(text_rect, html, css=PAGE_CSS)
+      y_offset = text_rect.y1 - spare_height + 10
+
+      # Add thumbnail below the text
+      if jpeg_bytes:
+          try:
+              img_rect = fitz.Rect(margin, y_offset, width - margin, min(y_offset + 300, height - 60))  # Keep clear of the footer
+              # fitz hashes image streams and reuses the xref for identical thumbnails
+              page.insert_image(img_rect, stream=jpeg_bytes)
+          except Exception as e:
+              page.insert_textbox(text_rect + (0, y_offset - margin, 0, 0), f"Thumbnail could not be loaded: {e}", fontsize=10, fontname="helv", color=(1, 0, 0), align=fitz.TEXT_ALIGN_LEFT)
 
       # Add footer
       footer_text = f"Page {index} - Generated by @venkatarangan"
       footer_rect = fitz.Rect(margin, height - 50, width - margin, height - 30)
       page.insert_textbox(footer_rect, footer_text, fontsize=10, fontname="helv", color=(0, 0, 0), align=fitz.TEXT_ALIGN_LEFT)
 
-  doc.save(output_file)
+  # Every insert_htmlbox call embeds its own copy of the font; subset them and
+  # merge the duplicate objects so the file does not grow by ~45 KB per page
+  doc.subset_fonts()
+  doc.save(output_file, garbage=4, deflate=True)
   doc.close()
 
+class DriverPool:
+  """Pool of headless Edge drivers, started on first use and shared by worker threads."""
+
+  def __init__(self, max_drivers):
+      self.executor = ThreadPoolExecutor(max_workers=max_drivers)
+      self.idle = queue.Queue()
+      self.drivers = []
+      self.lock = threading.Lock()
+      self.driver_path = None
+      self.driver_refreshed = False
+      self.free_profiles = []
+      self.started = 0
+
+  def acquire(self):
+      try:
+          return self.idle.get_nowait()
+      except queue.Empty:
+          with self.lock:
+              if self.driver_path is None:
+                  self.driver_path = get_driver_path()
+              driver_path = self.driver_path
+              if self.free_profiles:
+                  profile_index = self.free_profiles.pop()
+              else:
+                  profile_index = self.started
+                  self.started += 1
+
+          try:
+              driver = self.start_driver(driver_path, profile_index)
+          except Exception:
+              # Hand the profile back so failed starts do not leave new profile directories behind
+              with self.lock:
+                  self.free_profiles.append(profile_index)
+              raise
+          self.drivers.append(driver)
+          return driver
+
+  def start_driver(self, driver_path, profile_index):
+      """Start a driver, re-resolving msedgedriver once if the cached one fails."""
+      try:
+          return create_driver(driver_path, profile_index)
+      except WebDriverException:
+          with self.lock:
+              if self.driver_refreshed:
+                  if self.driver_path == driver_path:
+                      raise
+              else:
+                  print("Could not start Edge with the cached driver, downloading a matching one")
+                  self.driver_path = get_driver_path(refresh=True)
+                  self.driver_refreshed = True
+              driver_path = self.driver_path
+          return create_driver(driver_path, profile_index)
+
+  def fetch(self, url):
+      """Fetch page information for a URL with the next free driver."""
+      driver = self.acquire()
+      try:
+          title, thumbnail_url, price = fetch_page_info(driver, url)
+          accessed_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+          return title, thumbnail_url, price, accessed_time
+      finally:
+          self.idle.put(driver)
+
+  def close(self):
+      self.executor.shutdown()
+      for driver in self.drivers:
+          driver.quit()
+
+class ResizePool:
+  """Runs thumbnail resizes in threads, moving to processes once enough images need resizing."""
+
+  def __init__(self):
+      self.submitted = 0
+      self.threads = ThreadPoolExecutor(max_workers=IMAGE_WORKERS)
+      self.processes = None
+
+  def executor(self):
+      """Return the executor for the next resize; only called from the event loop thread."""
+      self.submitted += 1
+      if self.processes is None and self.submitted >= PROCESS_POOL_THRESHOLD:
+          # Spawn rather than fork, since Selenium and resolver threads are running;
+          # Windows cannot wait on more than 61 worker processes
+          self.processes = ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, 61),
+                                               mp_context=multiprocessing.get_context("spawn"))
+      return self.processes or self.threads
+
+  def __enter__(self):
+      return self
+
+  def __exit__(self, *exc_info):
+      self.threads.shutdown()
+      if self.processes is not None:
+          self.processes.shutdown()
+
+async def prepare_thumbnail(thumbnail_url, session, image_pool, cache):
+  """Download and resize a thumbnail, returning JPEG bytes or None."""
+  jpeg_bytes = cache_get(cache, 'thumbnail', thumbnail_url, PAGE_CACHE_TTL)
+  if jpeg_bytes is None:
+      try:
+          image_data = await fetch_bytes(session, thumbnail_url)
+      except Exception as e:
+          print(f"Error downloading image {thumbnail_url}: {e}")
+          return None
+      loop = asyncio.get_running_loop()
+      jpeg_bytes = await loop.run_in_executor(image_pool.executor(), download_and_process_image, image_data)
+      if jpeg_bytes:
+          cache_put(cache, 'thumbnail', thumbnail_url, jpeg_bytes)
+  return jpeg_bytes
+
+async def process_url(url, session, drivers, image_pool, thumbnails, cache):
+  """Scrape a URL and prepare its thumbnail, returning a PDF entry or None."""
+  loop = asyncio.get_running_loop()
+
+  # Reuse recent results from earlier runs
+  page = cache_get(cache, 'page', url, page_cache_ttl(url))
+  if not page:
+      # Non-Amazon pages are usually static; try a plain HTTP fetch first
+      if not is_amazon_url(url):
+          try:
+              title, thumbnail_url = await cheap_preview(session, url)
+              if thumbnail_url:
+                  accessed_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                  page = (title or 'No Title', thumbnail_url, None, accessed_time)
+          except Exception as e:
+              print(f"Plain fetch failed for {url}, falling back to browser: {e}")
+
+      # Everything else (Amazon, JS-rendered pages) goes through Selenium
+      if not page:
+          try:
+              page = await loop.run_in_executor(drivers.executor, drivers.fetch, url)
+          except Exception as e:
+              print(f"Error processing {url}: {e}")
+              return None
+      if page[0]:
+          cache_put(cache, 'page', url, page)
+
+  title, thumbnail_url, price, accessed_time = page
+  if not title:
+      return None
+
+  # Download and resize the thumbnail as soon as its URL is known; pages sharing
+  # a thumbnail wait on the same task instead of downloading it again
+  jpeg_bytes = None
+  if thumbnail_url:
+      task = thumbnails.get(thumbnail_url)
+      if task is None:
+          task = asyncio.ensure_future(prepare_thumbnail(thumbnail_url, session, image_pool, cache))
+          thumbnails[thumbnail_url] = task
+      jpeg_bytes = await task
+
+  return url, title, thumbnail_url, price, accessed_time, jpeg_bytes
+
+async def collect_data(urls, cache):
+  """Scrape all URLs and prepare their thumbnails, overlapping network and CPU work."""
+  # Warm the resolver in the background for pages that will actually be fetched
+  uncached = [url for url in urls if cache_get(cache, 'page', url, page_cache_ttl(url)) is None]
+  dns_warmup = asyncio.get_running_loop().run_in_executor(None, prewarm_dns, uncached)
+
+  drivers = DriverPool(MAX_WORKERS)
+  try:
+      async with create_session() as session:
+          with ResizePool() as image_pool:
+              thumbnails = {}
+              entries = await asyncio.gather(*(process_url(url, session, drivers, image_pool, thumbnails, cache) for url in urls))
+  finally:
+      drivers.close()
+      await dns_warmup
+
+  # gather keeps the PDF in the same order as urls.txt
+  return [entry for entry in entries if entry]
+
 def main():
   """Main function to read URLs, fetch data, and create PDF."""
+  parser = argparse.ArgumentParser(description="Generate a PDF digest of webpages listed in urls.txt.")
+  parser.add_argument('--no-cache', action='store_true', help="ignore and do not update the page cache")
+  args = parser.parse_args()
+
   input_file = 'urls.txt'
   output_file = 'webpage_details.pdf'
 
   # Read and validate URLs
   with open(input_file, 'r') as file:
       urls = []
-      for line in file:
-          line = line.strip()
-          if line:
-              if not line.startswith(('http://', 'https://')):
-                  line = 'https://' + line
-              urls.append(line)
-
-  data = []
-  for url in urls:
-      try:
-          title, thumbnail_url, price = fetch_page_info(url)
-          if title:
-              accessed_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-              data.append((url, title, thumbnail_url, price, accessed_time))
-      except Exception as e:
-          print(f"Error processing {url}: {e}")
+      for url, invalid in URL_RE.findall(file.read()):
+          if invalid:
+              print(f"Skipping invalid URL line: {invalid}")
+          elif url:
+              urls.append(url if url.startswith(('http://', 'https://')) else 'https://' + url)
+
+  cache = None if args.no_cache else open_cache()
+  try:
+      data = asyncio.run(collect_data(urls, cache))
+  finally:
+      if cache is not None:
+          cache.close()
 
   if data:
       create_pdf(data, output_file)
@@ -259,19 +694,7 @@ def main():
   else:
       print("No valid data to create PDF")
 
-  driver.quit()
-
 if __name__ == "__main__":
-  # Set up Selenium with Edge in headless mode
-  edge_options = Options()
-  edge_options.add_argument("--headless")
-  edge_options.add_argument("--disable-gpu")
-  edge_options.add_argument("--no-sandbox")
-  edge_options.add_argument("--log-level=3")
-  
-  # Initialize the WebDriver for Edge
-  driver = webdriver.Edge(service=Service(EdgeChromiumDriverManager().install()), options=edge_options)
-  
   main()
 
 # End of ProductDigestMu.py
\ No newline at end of file